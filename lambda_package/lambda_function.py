@@ -1,13 +1,22 @@
 import json
 import requests
 
+# Created lazily and kept on the module so warm invocations reuse the pooled TLS connection
+_HTTP = {}
+
+def _get_http():
+    session = _HTTP.get("session")
+    if session is None:
+        session = _HTTP["session"] = requests.Session()
+    return session
+
 def lambda_handler(event, context):
     """
     Fetches daily CO2 data from NOAA and returns the data in the response body.
     """
     url = "https://gml.noaa.gov/webdata/ccgg/trends/co2/co2_daily_mlo.txt"
     try:
-        response = requests.get(url, timeout=10)
+        response = _get_http().get(url, timeout=10)
         response.raise_for_status()
         return {
             "statusCode": 200,
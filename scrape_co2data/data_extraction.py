@@ -1,10 +1,20 @@
 import requests
 import pandas as pd
+import numpy as np
 import boto3
-import io
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 load_dotenv('.env')
+# zstd shrinks the CSVs further than gzip at a lower CPU cost; use it if this pyarrow build has it
+CSV_CODEC, CSV_SUFFIX = ("zstd", ".zst") if pa.Codec.is_available("zstd") else ("gzip", ".gz")
+# Suffixes earlier runs may have written a year's CSV under; the raw loaders match them all
+KNOWN_CSV_SUFFIXES = ("", ".gz", ".zst")
 # AWS S3 Configuration
 AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY")
 AWS_SECRET_KEY = os.getenv("AWS_SECRET_KEY")
@@ -12,67 +22,95 @@ S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
 S3_OBJECT_NAME = os.getenv("S3_OBJECT_NAME")
 AWS_REGION = os.getenv("AWS_REGION")
 PARENT_FOLDER = os.getenv("PARENT_FOLDER")
-# Initialize S3 client
+# Opt-in high-cardinality key prefix that spreads year writes across S3 partitions;
+# the raw COPY PATTERN matches <year>/co2_daily_mlo.csv with or without it
+HASH_PREFIX_KEYS = os.getenv("S3_HASH_PREFIX_KEYS", "").lower() in ("1", "true", "yes")
+# Year partitions uploaded at once; each is an independent PUT
+UPLOAD_WORKERS = 16
+# Initialize S3 client, shared by all upload threads (one pooled connection per
+# worker, adaptive retries to back off on S3 503 SlowDown)
 s3_client = boto3.client(
     "s3",
     aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
+    aws_secret_access_key=AWS_SECRET_KEY,
+    config=Config(
+        max_pool_connections=UPLOAD_WORKERS,
+        retries={"mode": "adaptive", "total_max_attempts": 10},
+        tcp_keepalive=True
+    )
 )
+# Years are already uploaded in parallel, so keep per-file multipart concurrency modest
+TRANSFER_CONFIG = TransferConfig(multipart_threshold=8 * 1024 * 1024, max_concurrency=4, use_threads=True)
 
 # URL of the data file
 url = "https://gml.noaa.gov/webdata/ccgg/trends/co2/co2_daily_mlo.txt"
 
-# Fetch data
-response = requests.get(url)
-data = response.text
-
-# Process lines
-lines = data.split("\n")
-
-# Remove comment lines (starting with "#")
-data_lines = [line for line in lines if not line.startswith("#") and line.strip()]
-
-# Split data into columns
-parsed_data = [line.split() for line in data_lines]
-
-# Check column count for each row
-max_columns = max(len(row) for row in parsed_data)
+# Column names based on the dataset structure; older files have no daily change column
+columns = ["Year", "Month", "Day", "Decimal Date", "CO2 (ppm)", "CO2 Daily Change"]
+# Decimal Date needs float64: 2024.0027 is beyond float32's ~7 significant digits
+dtypes = {"Year": "int16", "Month": "int8", "Day": "int8", "Decimal Date": "float64",
+          "CO2 (ppm)": "float32", "CO2 Daily Change": "float32"}
 
-# Define column names based on the dataset structure
-columns = ["Year", "Month", "Day", "Decimal Date", "CO2 (ppm)"]
-if max_columns == 6:
-    columns.append("CO2 Daily Change")
+# Fetch data and let pandas' C parser tokenize and type the stream as it arrives,
+# skipping comment lines (starting with "#") and mapping NOAA's missing-value markers to NaN
+with requests.get(url, stream=True) as response:
+    response.raise_for_status()
+    response.raw.decode_content = True
+    df = pd.read_csv(response.raw, comment="#", sep=r"\s+", header=None, names=columns,
+                     dtype=dtypes, engine="c", na_values=["-999.99", "-99.99"])
 
-# Create DataFrame
-df = pd.DataFrame(parsed_data, columns=columns)
+# Rows with only five fields leave the last column empty; drop it if no row has it
+if df["CO2 Daily Change"].isna().all():
+    df = df.drop(columns="CO2 Daily Change")
 
-# Convert numeric columns to appropriate types
-df["Year"] = df["Year"].astype(int)
-df["Month"] = df["Month"].astype(int)
-df["Day"] = df["Day"].astype(int)
-df["Decimal Date"] = df["Decimal Date"].astype(float)
-df["CO2 (ppm)"] = pd.to_numeric(df["CO2 (ppm)"], errors='coerce')
+def year_key(year):
+    """Return the S3 object name for one year's CSV within the parent folder."""
+    prefix = f"{PARENT_FOLDER}/"
+    if HASH_PREFIX_KEYS:
+        prefix += hashlib.blake2b(str(year).encode(), digest_size=2).hexdigest() + "/"
+    return f"{prefix}{year}/co2_daily_mlo.csv{CSV_SUFFIX}"
 
-# Handle missing column conditionally
-if "CO2 Daily Change" in df.columns:
-    df["CO2 Daily Change"] = pd.to_numeric(df["CO2 Daily Change"], errors='coerce')
+def stale_year_keys(year):
+    """Return the year's keys under the other CSV suffixes, which would otherwise be loaded alongside this one."""
+    base_key = year_key(year)[:-len(CSV_SUFFIX)]
+    return [base_key + suffix for suffix in KNOWN_CSV_SUFFIXES if suffix != CSV_SUFFIX]
 
-# Group data by Year and upload each year’s data separately within the parent folder
-for year, year_df in df.groupby("Year"):
-    # Save to in-memory buffer
-    csv_buffer = io.StringIO()
-    year_df.to_csv(csv_buffer, index=False)
+def upload_year(year, table):
+    """Upload one year's rows (an Arrow table) to S3 as a compressed CSV within the parent folder."""
+    # Serialize with Arrow's C++ CSV writer, compressing into one in-memory buffer
+    sink = pa.BufferOutputStream()
+    with pa.CompressedOutputStream(sink, CSV_CODEC) as compressed:
+        pacsv.write_csv(table, compressed)
+    buffer = pa.BufferReader(sink.getvalue())
     
     # Define dynamic S3 object name (folder structure within the parent folder)
-    s3_object_name = f"{PARENT_FOLDER}/{year}/co2_daily_mlo.csv"
+    s3_object_name = year_key(year)
 
-    # Upload to S3
-    s3_client.put_object(
+    # Stream the buffer to S3
+    s3_client.upload_fileobj(buffer, S3_BUCKET_NAME, s3_object_name, Config=TRANSFER_CONFIG)
+
+    print(f"File successfully uploaded to s3://{S3_BUCKET_NAME}/{s3_object_name}")
+
+    # Remove copies from runs that used another suffix, so a full reload doesn't load the year twice
+    s3_client.delete_objects(
         Bucket=S3_BUCKET_NAME,
-        Key=s3_object_name,
-        Body=csv_buffer.getvalue()
+        Delete={"Objects": [{"Key": key} for key in stale_year_keys(year)], "Quiet": True}
     )
 
-    print(f"File successfully uploaded to s3://{S3_BUCKET_NAME}/{s3_object_name}")
+# Split data by Year without copying: NOAA rows are in date order, so each year is one
+# contiguous run of rows and can be a zero-copy slice of a single Arrow table
+if not df["Year"].is_monotonic_increasing:
+    df = df.sort_values("Year", kind="stable")
+table = pa.Table.from_pandas(df, preserve_index=False)
+years = df["Year"].to_numpy()
+starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+ends = np.r_[starts[1:], len(years)]
+year_tables = [(int(years[start]), table.slice(start, end - start)) for start, end in zip(starts, ends)]
+
+# Upload each year’s data separately within the parent folder.
+# Uploads are network-bound and independent, so run them concurrently (boto3 clients are thread-safe).
+with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+    # list() re-raises the first upload error, if any
+    list(executor.map(lambda year_table: upload_year(*year_table), year_tables))
 
 print("All files uploaded successfully!")
@@ -6,7 +6,7 @@
 # SNOWFLAKE ADVANTAGE: Streams for incremental processing (CDC)
 # SNOWFLAKE ADVANTAGE: Efficient data processing
 
-from snowflake.snowpark import Session
+from snowflake_session import get_session
 from dotenv import load_dotenv
 import os
 import json
@@ -61,20 +61,27 @@ def test_raw_co2_stream(session):
     """Test the newly created stream"""
     session.use_schema('RAW_CO2')
     
-    # Check stream metadata
-    stream_info = session.sql("DESCRIBE STREAM CO2_DATA_STREAM").collect()
+    # Check stream metadata and contents in one multi-statement request
+    # (Snowpark's session.sql only returns the last result set, so use the connector cursor)
+    cursor = session.connection.cursor()
+    try:
+        cursor.execute('''
+            DESCRIBE STREAM CO2_DATA_STREAM;
+            SELECT * FROM CO2_DATA_STREAM 
+            WHERE METADATA$ACTION = 'INSERT' 
+            ORDER BY METADATA$ROW_ID
+            LIMIT 5
+        ''', num_statements=2)
+        stream_info = cursor.fetchall()
+        cursor.nextset()
+        stream_data = cursor.fetchall()
+    finally:
+        cursor.close()
+    
     print("\nStream details:")
     for info in stream_info:
         print(f"  {info}")
     
-    # Check stream contents
-    stream_data = session.sql('''
-        SELECT * FROM CO2_DATA_STREAM 
-        WHERE METADATA$ACTION = 'INSERT' 
-        ORDER BY METADATA$ROW_ID
-        LIMIT 5
-    ''').collect()
-    
     print(f"\nSample data from stream (found {len(stream_data)} rows):")
     for row in stream_data:
         print(f"  {row}")
@@ -82,16 +89,17 @@ def test_raw_co2_stream(session):
 # For local debugging
 if __name__ == "__main__":
     try:
-        # Create a Snowpark session using the configured profile
-        with Session.builder.config("connection_name", connection_name).getOrCreate() as session:
-            print(f"Connected to Snowflake using {connection_name} profile")
-            print(f"Current database: {session.get_current_database()}")
-            print(f"Current schema: {session.get_current_schema()}")
-            print(f"Current warehouse: {session.get_current_warehouse()}")
-            print(f"Current role: {session.get_current_role()}")
-            
-            create_raw_co2_stream(session)
-            test_raw_co2_stream(session)
+        # Get the process-wide Snowpark session for the configured profile, so any
+        # later step run in this process reuses it instead of reconnecting
+        session = get_session(connection_name)
+        print(f"Connected to Snowflake using {connection_name} profile")
+        print(f"Current database: {session.get_current_database()}")
+        print(f"Current schema: {session.get_current_schema()}")
+        print(f"Current warehouse: {session.get_current_warehouse()}")
+        print(f"Current role: {session.get_current_role()}")
+        
+        create_raw_co2_stream(session)
+        test_raw_co2_stream(session)
     except Exception as e:
         print(f"Error: {str(e)}")
         print(f"Error type: {type(e)}")
@@ -1,8 +1,9 @@
 import time
-from snowflake.snowpark import Session
+from snowflake_session import get_session
 from dotenv import load_dotenv
 import os
 import json
+import re
 
 # Load environment variables from .env file (for AWS credentials only, not for env)
 load_dotenv('.env')
@@ -40,57 +41,114 @@ CO2_TABLES = ['co2_data']
 TABLE_DICT = {
     "co2": {"tables": CO2_TABLES}
 }
+YEAR_FILE_RE = re.compile(r"(\d{4})/co2_daily_mlo\.csv(?:\.gz|\.zst)?$")
+# Qualified names of tables already ensured by CREATE TABLE IF NOT EXISTS in this process
+_TABLE_EXISTS = set()
+# COPY statement shared by every load, so only the table, stage location and year
+# pattern vary. Snowflake does not accept bind variables for these parts of a COPY.
+COPY_TEMPLATE = """
+COPY INTO {table} (YEAR, MONTH, DAY, DECIMAL_DATE, CO2_PPM)
+FROM (
+    SELECT 
+        $1, $2, $3, $4, $5
+    FROM {location}
+)
+FILE_FORMAT = (
+    TYPE = CSV
+    FIELD_DELIMITER = ','
+    SKIP_HEADER = 1
+    FIELD_OPTIONALLY_ENCLOSED_BY = '"'
+    COMPRESSION = AUTO
+)
+PATTERN = '.*{year_pattern}co2_daily_mlo\\.csv(\\.gz|\\.zst)?'
+ON_ERROR = CONTINUE
+"""
+# Staged CSV volume below which the XLARGE resize wait costs more than it saves
+SCALE_UP_MIN_BYTES = 256 * 1024 * 1024
 
 # SNOWFLAKE ADVANTAGE: Schema detection
 # SNOWFLAKE ADVANTAGE: Data ingestion with COPY
 # SNOWFLAKE ADVANTAGE: Snowflake Tables (not file-based)
 
-def load_raw_table(session, tname=None, s3dir=None, year=None):
-    """Load data from stage into raw tables"""
-    session.use_schema(DEFAULT_SCHEMA)
-    # Adjust path to match actual structure: noaa-co2-data/YYYY/co2_daily_mlo.csv
-    if year is None:
+def loaded_years(session, tname):
+    """Return the years whose file COPY loaded into tname during the last day"""
+    try:
+        rows = session.sql(f"""
+        SELECT FILE_NAME FROM TABLE(INFORMATION_SCHEMA.COPY_HISTORY(
+            TABLE_NAME => '{DEFAULT_SCHEMA}.{tname}',
+            START_TIME => DATEADD('day', -1, CURRENT_TIMESTAMP())))
+        WHERE STATUS = 'Loaded'
+        """).collect()
+    except Exception as e:
+        print(f"Could not read copy history for {tname}: {e}")
+        return set()
+    # FILE_NAME ends in <year>/co2_daily_mlo.csv[.gz|.zst] however the stage URL is rooted
+    return {int(m.group(1)) for row in rows if (m := YEAR_FILE_RE.search(row[0]))}
+
+def staged_year_sizes(session, years):
+    """Return {year: bytes} for the requested years that have files on the stage, from one LIST"""
+    year_pattern = "|".join(str(y) for y in years)
+    files = session.sql(f"LIST @EXTERNAL.NOAA_CO2_STAGE PATTERN = '.*({year_pattern})/co2_daily_mlo\\.csv(\\.gz|\\.zst)?'").collect()
+    sizes = {}
+    for row in files:
+        m = YEAR_FILE_RE.search(row[0])
+        if m:
+            year = int(m.group(1))
+            sizes[year] = sizes.get(year, 0) + int(row[1])
+    return sizes
+
+def ensure_raw_table(session, tname):
+    """Create DEFAULT_SCHEMA.tname if it doesn't exist, once per process"""
+    qualified_name = f"{DEFAULT_SCHEMA}.{tname}".upper()
+    if qualified_name in _TABLE_EXISTS:
+        return
+    # IF NOT EXISTS makes this a single round trip instead of a SHOW TABLES probe plus CREATE
+    session.sql(f"""
+    CREATE TABLE IF NOT EXISTS {DEFAULT_SCHEMA}.{tname} (
+        YEAR NUMBER(4,0),
+        MONTH NUMBER(2,0),
+        DAY NUMBER(2,0),
+        DECIMAL_DATE FLOAT,
+        CO2_PPM FLOAT
+    )
+    """).collect()
+    _TABLE_EXISTS.add(qualified_name)
+
+def load_raw_table(session, tname=None, s3dir=None, year=None, years=None):
+    """Load data from stage into raw tables
+
+    Pass years to load several year folders with a single COPY instead of one per year;
+    year loads a single year folder. All names are schema-qualified, so the
+    session's current schema is left untouched.
+    """
+    # Create table if it doesn't exist
+    ensure_raw_table(session, tname)
+    # Adjust path to match actual structure: noaa-co2-data/YYYY/co2_daily_mlo.csv[.gz|.zst]
+    year_pattern = ""
+    if years is not None:
+        years = list(years)
+        print('\tLoading years {}-{}'.format(years[0], years[-1]))
+        # Skip year files the table already loaded recently; COPY would only re-list them
+        loaded = loaded_years(session, tname)
+        years = [y for y in years if y not in loaded]
+        if not years:
+            print(f"\tAll years already loaded into {DEFAULT_SCHEMA}.{tname}, skipping COPY")
+            return
+        location = "@EXTERNAL.NOAA_CO2_STAGE/"
+        year_pattern = "({})/".format("|".join(str(y) for y in years))
+    elif year is None:
         location = "@EXTERNAL.NOAA_CO2_STAGE/"
     else:
         print('\tLoading year {}'.format(year)) 
         location = "@EXTERNAL.NOAA_CO2_STAGE/{}/".format(year)
     
-    # Create table if it doesn't exist
-    if not session.sql(f"SHOW TABLES LIKE '{tname}' IN SCHEMA {DEFAULT_SCHEMA}").collect():
-        print(f"Creating table {DEFAULT_SCHEMA}.{tname}")
-        session.sql(f"""
-        CREATE TABLE {DEFAULT_SCHEMA}.{tname} (
-            YEAR NUMBER(4,0),
-            MONTH NUMBER(2,0),
-            DAY NUMBER(2,0),
-            DECIMAL_DATE FLOAT,
-            CO2_PPM FLOAT
-        )
-        """).collect()
-    
     # Try loading with explicit schema and without compression
     try:
         # Define the schema explicitly
         print(f"Loading data from {location} into {DEFAULT_SCHEMA}.{tname}")
         
         # Try direct COPY command instead of DataFrame
-        copy_sql = f"""
-        COPY INTO {DEFAULT_SCHEMA}.{tname} (YEAR, MONTH, DAY, DECIMAL_DATE, CO2_PPM)
-        FROM (
-            SELECT 
-                $1, $2, $3, $4, $5
-            FROM {location}
-        )
-        FILE_FORMAT = (
-            TYPE = CSV
-            FIELD_DELIMITER = ','
-            SKIP_HEADER = 1
-            FIELD_OPTIONALLY_ENCLOSED_BY = '"'
-        )
-        
-        PATTERN = '.*co2_daily_mlo\\.csv'
-        ON_ERROR = CONTINUE
-        """
+        copy_sql = COPY_TEMPLATE.format(table=f"{DEFAULT_SCHEMA}.{tname}", location=location, year_pattern=year_pattern)
         
         result = session.sql(copy_sql).collect()
         print(f"Loaded data into {DEFAULT_SCHEMA}.{tname}: {result}")
@@ -101,7 +159,7 @@ def load_raw_table(session, tname=None, s3dir=None, year=None):
     
     # Add comment to table
     comment_text = '''{"origin":"sf_sit-is","name":"co2_data_pipeline","version":{"major":1, "minor":0}}'''
-    sql_command = f"""COMMENT ON TABLE {tname} IS '{comment_text}';"""
+    sql_command = f"""COMMENT ON TABLE {DEFAULT_SCHEMA}.{tname} IS '{comment_text}';"""
     session.sql(sql_command).collect()
 
 def load_all_raw_tables(session):
@@ -113,61 +171,85 @@ def load_all_raw_tables(session):
         return
         
     print(f"Using warehouse: {current_warehouse}")
+    years = range(1974, 2020)
+    scaled_up = False
     
     try:
-        # Scale up the warehouse for better performance
-        session.sql(f"ALTER WAREHOUSE {current_warehouse} SET WAREHOUSE_SIZE = XLARGE WAIT_FOR_COMPLETION = TRUE").collect()
-        print(f"Warehouse {current_warehouse} scaled up to XLARGE")
+        # Find which years actually have staged files, and how large they are
+        try:
+            year_sizes = staged_year_sizes(session, years)
+        except Exception as e:
+            print(f"Could not list staged files, assuming every year is staged and a large load: {e}")
+            year_sizes = None
+        total_bytes = None
+        if year_sizes is not None:
+            if not year_sizes:
+                print(f"No staged files found for years {years[0]}-{years[-1]}, nothing to load")
+                return
+            # Only name years that exist in the COPY pattern
+            years = sorted(year_sizes)
+            total_bytes = sum(year_sizes.values())
+        
+        # Scale up the warehouse for better performance, unless the files are small
+        # enough that waiting for the resize would take longer than the COPY
+        if total_bytes is not None and total_bytes < SCALE_UP_MIN_BYTES:
+            print(f"Staged files total {total_bytes} bytes, keeping current warehouse size")
+        else:
+            scaled_up = True
+            session.sql(f"ALTER WAREHOUSE {current_warehouse} SET WAREHOUSE_SIZE = XLARGE WAIT_FOR_COMPLETION = TRUE").collect()
+            print(f"Warehouse {current_warehouse} scaled up to XLARGE")
         
         # Process all tables
         for s3dir, data in TABLE_DICT.items():
             tnames = data['tables']
             for tname in tnames:
                 print(f"Loading {tname}")
-                # Load data for specified years
-                for year in range(1974, 2020):
-                    try:
-                        load_raw_table(session, tname=tname, s3dir=s3dir, year=year)
-                    except Exception as e:
-                        print(f"Error loading data for year {year}: {e}")
-                        # Continue with next year instead of failing completely
+                # Load all specified years with one COPY; ON_ERROR = CONTINUE skips bad rows
+                try:
+                    load_raw_table(session, tname=tname, s3dir=s3dir, years=years)
+                except Exception as e:
+                    print(f"Error loading data for {tname}: {e}")
+                    # Continue with next table instead of failing completely
     except Exception as e:
         print(f"Error during raw data loading: {e}")
         raise
     finally:
         # Always scale down the warehouse when done, even if there was an error
-        try:
-            session.sql(f"ALTER WAREHOUSE {current_warehouse} SET WAREHOUSE_SIZE = XSMALL").collect()
-            print(f"Warehouse {current_warehouse} scaled down to XSMALL")
-        except Exception as scaling_error:
-            print(f"Warning: Failed to scale down warehouse: {scaling_error}")
+        if scaled_up:
+            try:
+                session.sql(f"ALTER WAREHOUSE {current_warehouse} SET WAREHOUSE_SIZE = XSMALL").collect()
+                print(f"Warehouse {current_warehouse} scaled down to XSMALL")
+            except Exception as scaling_error:
+                print(f"Warning: Failed to scale down warehouse: {scaling_error}")
 
 def validate_raw_tables(session):
     """Validate loaded tables"""
-    # Check column names from the inferred schema
     for tname in CO2_TABLES:
-        print(f'{tname}: \n\t{session.table(f"{DEFAULT_SCHEMA}." + tname).columns}\n')
+        # One query returns both the column names and the sample rows
+        sample = session.sql(f"SELECT * FROM {DEFAULT_SCHEMA}.{tname} LIMIT 5").to_pandas()
+        print(f'{tname}: \n\t{list(sample.columns)}\n')
         # Display sample data
         print(f'Sample data:')
-        print(session.sql(f"SELECT * FROM {DEFAULT_SCHEMA}.{tname} LIMIT 5").collect())
+        print(sample)
 
 # For local debugging
 if __name__ == "__main__":
     try:
-        # Create a Snowpark session using the configured profile
-        with Session.builder.config("connection_name", connection_name).getOrCreate() as session:
-            print(f"Connected to Snowflake using {connection_name} profile")
-            print(f"Current database: {session.get_current_database()}")
-            print(f"Current schema: {session.get_current_schema()}")
-            print(f"Current warehouse: {session.get_current_warehouse()}")
-            print(f"Current role: {session.get_current_role()}")
-            
-            # Set default schema
-            session.use_schema(DEFAULT_SCHEMA)
-            print(f"Set active schema to: {DEFAULT_SCHEMA}")
-            
-            load_all_raw_tables(session)
-            validate_raw_tables(session)
+        # Get the process-wide Snowpark session for the configured profile, so any
+        # later step run in this process reuses it instead of reconnecting
+        session = get_session(connection_name)
+        print(f"Connected to Snowflake using {connection_name} profile")
+        print(f"Current database: {session.get_current_database()}")
+        print(f"Current schema: {session.get_current_schema()}")
+        print(f"Current warehouse: {session.get_current_warehouse()}")
+        print(f"Current role: {session.get_current_role()}")
+        
+        # Set default schema
+        session.use_schema(DEFAULT_SCHEMA)
+        print(f"Set active schema to: {DEFAULT_SCHEMA}")
+        
+        load_all_raw_tables(session)
+        validate_raw_tables(session)
     except Exception as e:
         print(f"Error: {str(e)}")
         print(f"Error type: {type(e)}")
@@ -0,0 +1,14 @@
+import atexit
+from snowflake.snowpark import Session
+
+# One Snowpark session per process, shared by every pipeline step that runs in it
+_SESSION = None
+
+def get_session(connection_name):
+    """Return the process-wide Snowpark session, creating it on first use"""
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = Session.builder.config("connection_name", connection_name).getOrCreate()
+        # Close it once when the process exits instead of after each step
+        atexit.register(_SESSION.close)
+    return _SESSION
@@ -5,6 +5,18 @@ import datetime
 from jinja2 import Environment, FileSystemLoader
 from dotenv import load_dotenv
 import json
+from functools import lru_cache
+
+# Prefer the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+@lru_cache(maxsize=None)
+def get_jinja_env(templates_dir):
+    """Return one Jinja environment per templates directory, so compiled templates are reused across renders."""
+    return Environment(loader=FileSystemLoader(templates_dir), cache_size=400, auto_reload=False)
 
 def render_templates(env_name):
     """
@@ -24,10 +36,10 @@ def render_templates(env_name):
     
     # Load environment configuration
     with open(config_file, "r", encoding="utf-8") as f:
-        config = yaml.safe_load(f)
+        config = yaml.load(f, Loader=YamlLoader)
     
-    # Set up Jinja environment
-    jinja_env = Environment(loader=FileSystemLoader(templates_dir))
+    # Set up Jinja environment (shared across calls, e.g. rendering dev then prod)
+    jinja_env = get_jinja_env(templates_dir)
     
     # Add current date
     current_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -4,6 +4,8 @@ import yaml
 from string import Template
 import glob
 import json
+import re
+from pathlib import Path
 
 # Get environment from command line or use default
 env = sys.argv[1] if len(sys.argv) > 1 else "dev"
@@ -29,6 +31,16 @@ database_name = config.get("database_name", f"co2_db_{env}")
 role_name = config.get("role_name", f"co2_role_{env}")
 warehouse_name = config.get("warehouse_name", f"co2_wh_{env}")
 
+# Placeholder values, substituted in a single pass over each template
+replacements = {
+    "DATABASE_NAME": database_name,
+    "ROLE_NAME": role_name,
+    "WAREHOUSE_NAME": warehouse_name
+}
+placeholder_pattern = re.compile(r"\{\{\s*(" + "|".join(replacements) + r")\s*\}\}")
+# Output directories already created, so each is only made once
+created_dirs = set()
+
 # Define template files to process
 template_files = [
     {
@@ -69,30 +81,23 @@ for file_config in template_files:
     
     # Read the template file
     try:
-        with open(template_path, "r") as f:
-            template_content = f.read()
+        template_content = Path(template_path).read_text()
     except Exception as e:
         print(f"Error reading template file {template_path}: {e}")
         continue
     
     # Replace the placeholders
-    replacements = {
-        "{{ DATABASE_NAME }}": database_name,
-        "{{ ROLE_NAME }}": role_name,
-        "{{ WAREHOUSE_NAME }}": warehouse_name
-    }
-    
-    rendered_content = template_content
-    for placeholder, value in replacements.items():
-        rendered_content = rendered_content.replace(placeholder, value)
+    rendered_content = placeholder_pattern.sub(lambda m: replacements[m.group(1)], template_content)
     
     # Ensure output directory exists
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    output_dir = os.path.dirname(output_path)
+    if output_dir not in created_dirs:
+        os.makedirs(output_dir, exist_ok=True)
+        created_dirs.add(output_dir)
     
     # Write to the output file
     try:
-        with open(output_path, "w") as f:
-            f.write(rendered_content)
+        Path(output_path).write_text(rendered_content)
         print(f"Generated {os.path.basename(output_path)} for {env.upper()} environment")
     except Exception as e:
         print(f"Error writing to {output_path}: {e}")
@@ -2,10 +2,51 @@ import os
 import sys
 import argparse
 import base64
+import functools
 from pathlib import Path
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
 
+# Printed after a successful check, as one block rather than a print() per line
+SAMPLE_CONNECTION_CODE = """
+Sample connection code:
+-----------------------
+import snowflake.connector
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+
+# Read private key from {key_path}
+with open(key_path, 'rb') as key_file:
+    p_key = serialization.load_pem_private_key(
+        key_file.read(),
+        password=None,
+        backend=default_backend()
+    )
+
+# Convert to DER format
+pkb = p_key.private_bytes(
+    encoding=serialization.Encoding.DER,
+    format=serialization.PrivateFormat.PKCS8,
+    encryption_algorithm=serialization.NoEncryption()
+)
+
+# Connect to Snowflake
+conn = snowflake.connector.connect(
+    user='YOUR_USERNAME',
+    account='YOUR_ACCOUNT',
+    private_key=pkb
+)
+
+✅ The key appears to be valid for Snowflake key-pair authentication!
+   Add it to your GitHub secrets or use it locally.
+"""
+
+@functools.lru_cache(maxsize=4)
+def _read_key(key_path, mtime):
+    """Read a key file once per (path, mtime), so checking and formatting share one read."""
+    with open(key_path, "rb") as key_file:
+        return key_file.read()
+
 def check_key_auth(key_path):
     """
     Check if a private key file is valid for Snowflake authentication.
@@ -18,16 +59,17 @@ def check_key_auth(key_path):
     
     print(f"Checking private key at: {key_path}")
     
-    if not os.path.exists(key_path):
+    try:
+        key_stat = os.stat(key_path)
+    except FileNotFoundError:
         print(f"❌ ERROR: File does not exist: {key_path}")
         return False
     
-    print(f"✓ File exists ({os.path.getsize(key_path)} bytes)")
+    print(f"✓ File exists ({key_stat.st_size} bytes)")
     
     try:
         # Read the file
-        with open(key_path, "rb") as key_file:
-            key_data = key_file.read()
+        key_data = _read_key(key_path, key_stat.st_mtime)
         
         print(f"✓ File read successfully")
         
@@ -59,37 +101,8 @@ def check_key_auth(key_path):
         
         print(f"✓ Key converted to DER format successfully!")
         
-        # Create a sample connection code
-        print("\nSample connection code:")
-        print("-----------------------")
-        print("import snowflake.connector")
-        print("from cryptography.hazmat.backends import default_backend")
-        print("from cryptography.hazmat.primitives import serialization")
-        print("")
-        print(f"# Read private key from {key_path}")
-        print("with open(key_path, 'rb') as key_file:")
-        print("    p_key = serialization.load_pem_private_key(")
-        print("        key_file.read(),")
-        print("        password=None,")
-        print("        backend=default_backend()")
-        print("    )")
-        print("")
-        print("# Convert to DER format")
-        print("pkb = p_key.private_bytes(")
-        print("    encoding=serialization.Encoding.DER,")
-        print("    format=serialization.PrivateFormat.PKCS8,")
-        print("    encryption_algorithm=serialization.NoEncryption()")
-        print(")")
-        print("")
-        print("# Connect to Snowflake")
-        print("conn = snowflake.connector.connect(")
-        print("    user='YOUR_USERNAME',")
-        print("    account='YOUR_ACCOUNT',")
-        print("    private_key=pkb")
-        print(")")
-        
-        print("\n✅ The key appears to be valid for Snowflake key-pair authentication!")
-        print("   Add it to your GitHub secrets or use it locally.")
+        # Print the sample connection code and the verdict in one write
+        sys.stdout.write(SAMPLE_CONNECTION_CODE.format(key_path=key_path))
         
         return True
     except Exception as e:
@@ -106,23 +119,26 @@ def format_key_for_github(key_path):
     # Expand the path
     key_path = os.path.expanduser(key_path)
     
-    if not os.path.exists(key_path):
+    try:
+        mtime = os.stat(key_path).st_mtime
+    except FileNotFoundError:
         print(f"❌ ERROR: File does not exist: {key_path}")
         return
     
     try:
-        # Read the file
-        with open(key_path, "rb") as key_file:
-            key_data = key_file.read()
+        # Read the file (already cached if check_key_auth just read it)
+        key_data = _read_key(key_path, mtime)
         
         # Format for GitHub secrets (keep newlines)
         formatted = key_data.decode('utf-8')
         
-        print("\nFormatted key for GitHub secrets:")
-        print("--------------------------------")
-        print(formatted)
-        print("--------------------------------")
-        print("\nAdd this entire text including BEGIN/END lines and all newlines to your GitHub secret.")
+        print("\n".join([
+            "\nFormatted key for GitHub secrets:",
+            "--------------------------------",
+            formatted,
+            "--------------------------------",
+            "\nAdd this entire text including BEGIN/END lines and all newlines to your GitHub secret.",
+        ]))
     except Exception as e:
         print(f"❌ ERROR: {str(e)}")
 
@@ -130,10 +146,14 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Check if a private key is valid for Snowflake authentication")
     parser.add_argument("--key-path", default="~/.snowflake/keys/rsa_key.p8", help="Path to the private key file")
     parser.add_argument("--format-for-github", action="store_true", help="Format the key for GitHub secrets")
+    parser.add_argument("--check-and-format", action="store_true", help="Check the key, then format it for GitHub secrets if it is valid")
     
     args = parser.parse_args()
     
-    if args.format_for_github:
+    if args.check_and_format:
+        if check_key_auth(args.key_path):
+            format_key_for_github(args.key_path)
+    elif args.format_for_github:
         format_key_for_github(args.key_path)
     else:
         check_key_auth(args.key_path)
@@ -3,50 +3,78 @@ from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives import serialization
 import argparse
+import subprocess
 
-def generate_key_pair(output_dir, key_size=2048):
+def generate_key_pair(output_dir, key_size=2048, reuse_if_exists=False, backend="cryptography"):
     """Generate RSA key pair for Snowflake authentication."""
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
+    private_key_path = os.path.join(output_dir, "rsa_key.p8")
+    public_key_path = os.path.join(output_dir, "rsa_key.pub")
+    sql_path = os.path.join(output_dir, "register_key.sql")
     
-    # Generate private key
-    private_key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=key_size,
-        backend=default_backend()
-    )
+    # Keep a previously generated pair instead of paying for prime search again
+    if reuse_if_exists and all(os.path.exists(p) for p in (private_key_path, public_key_path, sql_path)):
+        print(f"Reusing existing keys in {output_dir}")
+        return private_key_path, public_key_path, sql_path
     
-    # Get public key
-    public_key = private_key.public_key()
+    if backend == "openssl":
+        # openssl writes an unencrypted PKCS8 PEM, the same format written below
+        subprocess.check_call([
+            "openssl", "genpkey", "-algorithm", "RSA",
+            "-pkeyopt", f"rsa_keygen_bits:{key_size}",
+            "-outform", "PEM", "-out", private_key_path
+        ])
+        with open(private_key_path, "rb") as f:
+            private_key = serialization.load_pem_private_key(f.read(), password=None, backend=default_backend())
+    else:
+        # Generate private key
+        private_key = rsa.generate_private_key(
+            public_exponent=65537,
+            key_size=key_size,
+            backend=default_backend()
+        )
+        
+        # Write private key in PEM PKCS8 format (no encryption)
+        with open(private_key_path, "wb") as f:
+            f.write(
+                private_key.private_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PrivateFormat.PKCS8,
+                    encryption_algorithm=serialization.NoEncryption()
+                )
+            )
     
-    # Write private key in PEM PKCS8 format (no encryption)
-    private_key_path = os.path.join(output_dir, "rsa_key.p8")
-    with open(private_key_path, "wb") as f:
+    # Also keep the private key as PKCS8 DER, the form the Snowflake connector takes,
+    # so connecting does not have to parse the PEM and re-encode it every time
+    der_path = os.path.join(output_dir, "rsa_key.der")
+    # Unencrypted private key, so keep it readable by the owner only
+    fd = os.open(der_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
         f.write(
             private_key.private_bytes(
-                encoding=serialization.Encoding.PEM,
+                encoding=serialization.Encoding.DER,
                 format=serialization.PrivateFormat.PKCS8,
                 encryption_algorithm=serialization.NoEncryption()
             )
         )
     
+    # Get public key
+    public_key = private_key.public_key()
+    
+    # Encode the public key once; the same PEM goes to the .pub file and the SQL script
+    public_key_pem = public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    
     # Write public key
-    public_key_path = os.path.join(output_dir, "rsa_key.pub")
     with open(public_key_path, "wb") as f:
-        f.write(
-            public_key.public_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo
-            )
-        )
+        f.write(public_key_pem)
     
     # Create a SQL script to register the public key with Snowflake
-    public_key_text = public_key.public_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PublicFormat.SubjectPublicKeyInfo
-    ).decode('utf-8').strip()
+    public_key_text = public_key_pem.decode('utf-8').strip()
     
-    sql_path = os.path.join(output_dir, "register_key.sql") 
     with open(sql_path, "w") as f:
         f.write(f"""-- Execute this SQL in Snowflake to register your public key
 ALTER USER YOUR_USERNAME SET RSA_PUBLIC_KEY='{public_key_text}';
@@ -57,6 +85,7 @@ DESC USER YOUR_USERNAME;
     
     print(f"Keys generated successfully:")
     print(f"  Private key: {private_key_path}")
+    print(f"  Private key (DER): {der_path}")
     print(f"  Public key: {public_key_path}")
     print(f"  SQL script: {sql_path}")
     print("\nIMPORTANT: Update the SQL script with your username and execute it in Snowflake.")
@@ -67,7 +96,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate RSA key pair for Snowflake authentication")
     parser.add_argument("--output", default="~/.snowflake/keys", help="Output directory for keys")
     parser.add_argument("--key-size", type=int, default=2048, help="Key size in bits")
+    parser.add_argument("--reuse-if-exists", action="store_true", help="Keep existing keys in the output directory instead of generating new ones")
+    parser.add_argument("--backend", choices=["cryptography", "openssl"], default="cryptography", help="Generate the private key in-process or with the openssl CLI")
     args = parser.parse_args()
     
     output_dir = os.path.expanduser(args.output)
-    generate_key_pair(output_dir, args.key_size)
+    generate_key_pair(output_dir, args.key_size, reuse_if_exists=args.reuse_if_exists, backend=args.backend)
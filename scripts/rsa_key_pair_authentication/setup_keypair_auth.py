@@ -1,12 +1,13 @@
 import os
 import sys
 import argparse
+import subprocess
 from pathlib import Path
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives import serialization
 
-def setup_keypair_auth(username, account_name, key_dir="~/.snowflake/keys", key_size=2048):
+def setup_keypair_auth(username, account_name, key_dir="~/.snowflake/keys", key_size=2048, backend="cryptography"):
     """
     Set up key pair authentication for Snowflake.
     
@@ -15,6 +16,7 @@ def setup_keypair_auth(username, account_name, key_dir="~/.snowflake/keys", key_
         account_name: Snowflake account name
         key_dir: Directory to store keys
         key_size: Size of the RSA key
+        backend: "cryptography" to generate the key in-process, or "openssl" to use the openssl CLI
     """
     # Expand the path
     key_dir = os.path.expanduser(key_dir)
@@ -24,42 +26,54 @@ def setup_keypair_auth(username, account_name, key_dir="~/.snowflake/keys", key_
     
     print(f"Generating {key_size}-bit RSA key pair for Snowflake authentication...")
     
-    # Generate private key
-    private_key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=key_size,
-        backend=default_backend()
-    )
+    private_key_path = os.path.join(key_dir, "rsa_key.p8")
+    if backend == "openssl":
+        # openssl writes an unencrypted PKCS8 PEM, the same format written below
+        subprocess.check_call([
+            "openssl", "genpkey", "-algorithm", "RSA",
+            "-pkeyopt", f"rsa_keygen_bits:{key_size}",
+            "-outform", "PEM", "-out", private_key_path
+        ])
+        with open(private_key_path, "rb") as f:
+            private_key = serialization.load_pem_private_key(f.read(), password=None, backend=default_backend())
+    else:
+        # Key generation runs in the OpenSSL that cryptography links against;
+        # an old build is much slower at the prime search, so show which one is used
+        print(f"Using {default_backend().openssl_version_text()}")
+        
+        # Generate private key
+        private_key = rsa.generate_private_key(
+            public_exponent=65537,
+            key_size=key_size,
+            backend=default_backend()
+        )
+        
+        # Save private key
+        with open(private_key_path, "wb") as f:
+            f.write(
+                private_key.private_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PrivateFormat.PKCS8,
+                    encryption_algorithm=serialization.NoEncryption()
+                )
+            )
     
     # Get public key
     public_key = private_key.public_key()
     
-    # Save private key
-    private_key_path = os.path.join(key_dir, "rsa_key.p8")
-    with open(private_key_path, "wb") as f:
-        f.write(
-            private_key.private_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PrivateFormat.PKCS8,
-                encryption_algorithm=serialization.NoEncryption()
-            )
-        )
+    # Encode the public key once; the same PEM goes to the .pub file and the SQL script
+    public_key_pem = public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
     
     # Save public key
     public_key_path = os.path.join(key_dir, "rsa_key.pub")
     with open(public_key_path, "wb") as f:
-        f.write(
-            public_key.public_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo
-            )
-        )
+        f.write(public_key_pem)
     
     # Format public key for Snowflake SQL
-    public_key_text = public_key.public_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PublicFormat.SubjectPublicKeyInfo
-    ).decode("utf-8")
+    public_key_text = public_key_pem.decode("utf-8")
     
     # Remove header and footer
     clean_public_key = "".join(public_key_text.strip().split("\n")[1:-1])
@@ -112,15 +126,17 @@ conn.close()
 print("Connection successful!")
 """)
 
-    print(f"\nKey pair generated successfully!")
-    print(f"Private key: {private_key_path}")
-    print(f"Public key: {public_key_path}")
-    print(f"SQL script: {sql_path}")
-    print(f"Test script: {test_script_path}")
-    print("\nNEXT STEPS:")
-    print(f"1. Execute the SQL script in Snowflake to register your public key")
-    print(f"2. Run the test script to verify the key authentication works")
-    print(f"3. Update your connections.toml file to use key authentication")
+    print(f"""
+Key pair generated successfully!
+Private key: {private_key_path}
+Public key: {public_key_path}
+SQL script: {sql_path}
+Test script: {test_script_path}
+
+NEXT STEPS:
+1. Execute the SQL script in Snowflake to register your public key
+2. Run the test script to verify the key authentication works
+3. Update your connections.toml file to use key authentication""")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Set up key pair authentication for Snowflake")
@@ -128,7 +144,8 @@ if __name__ == "__main__":
     parser.add_argument("--account", required=True, help="Snowflake account name")
     parser.add_argument("--key-dir", default="~/.snowflake/keys", help="Directory to store keys")
     parser.add_argument("--key-size", type=int, default=2048, help="RSA key size (bits)")
+    parser.add_argument("--backend", choices=["cryptography", "openssl"], default="cryptography", help="Generate the private key in-process or with the openssl CLI")
     
     args = parser.parse_args()
     
-    setup_keypair_auth(args.username, args.account, args.key_dir, args.key_size)
+    setup_keypair_auth(args.username, args.account, args.key_dir, args.key_size, args.backend)
@@ -0,0 +1,51 @@
+import importlib
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Repository root, so the UDF and stored procedure modules import by their package path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+def pytest_configure(config):
+    """Put the project root on sys.path once for the whole test session."""
+    project_root = str(PROJECT_ROOT)
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+def _import_function_module(component, package):
+    """Import udfs_and_spoc/<component>/<package>/function.py with ENV set, as the module reads it at import time.
+
+    Importing by package path keeps each component's function.py under its own module name,
+    so test files for different components can run in the same session.
+    """
+    with patch.dict(os.environ, {"ENV": "dev"}):
+        return importlib.import_module(f"udfs_and_spoc.{component}.{package}.function")
+
+@pytest.fixture(scope="session")
+def analytical_function():
+    """The co2_analytical_sp stored procedure module."""
+    return _import_function_module("co2_analytical_sp", "co2_analytical_sp")
+
+@pytest.fixture(scope="session")
+def harmonized_function():
+    """The co2_harmonized_sp stored procedure module."""
+    return _import_function_module("co2_harmonized_sp", "co2_harmonized_sp")
+
+@pytest.fixture
+def mock_session():
+    """A fresh mock Snowflake session with the common current-session defaults.
+
+    Test modules that need different defaults override this fixture and build on it.
+    """
+    session = MagicMock()
+    
+    # Mock current session state methods
+    session.get_current_database.return_value = "CO2_DB_DEV"
+    session.get_current_schema.return_value = "ANALYTICS_CO2"
+    session.get_current_warehouse.return_value = "CO2_WH_DEV"
+    session.get_current_role.return_value = "CO2_ROLE_DEV"
+    
+    return session
@@ -1,24 +1,23 @@
 import pytest
-import sys
-import os
+from collections import namedtuple
 from unittest.mock import patch, MagicMock
 
-# Add the parent directory to path so we can import the function module
-sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                           "udfs_and_spoc", "co2_harmonized_sp", "co2_harmonized_sp"))
+# Stand-in for a Snowpark Row from SHOW TABLES: a tuple whose fields are also attributes
+Row = namedtuple("Row", ["name"])
 
-# Import the module but patch the environment before importing the specific functions
-with patch.dict('os.environ', {"ENV": "dev"}):
-    import function as harmonized_function
-    from function import main, table_exists, create_harmonized_table, merge_raw_into_harmonized
+# The co2_harmonized_sp module comes from the harmonized_function fixture in conftest.py
+
+@pytest.fixture(autouse=True)
+def _env_dev(harmonized_function):
+    """Run every test against the dev environment unless it patches env itself."""
+    with patch.object(harmonized_function, 'env', 'dev'):
+        yield
 
 @pytest.fixture
-def mock_session():
-    """Create a mock Snowflake session."""
-    mock = MagicMock()
-    # Mock collect method
-    mock.sql().collect.return_value = []
-    return mock
+def mock_session(mock_session):
+    """The shared mock Snowflake session, with queries returning no rows by default."""
+    mock_session.sql().collect.return_value = []
+    return mock_session
 
 @pytest.fixture
 def mock_snowpark_functions():
@@ -33,24 +32,24 @@ def mock_snowpark_functions():
         mock_functions.when_not_matched.return_value.insert.return_value = MagicMock()
         yield mock_functions
 
-def test_table_exists_when_table_present(mock_session):
+def test_table_exists_when_table_present(mock_session, harmonized_function):
     """Test table_exists when table is present."""
-    mock_session.sql().collect.return_value = [{'name': 'harmonized_co2'}]
-    assert table_exists(mock_session, 'HARMONIZED_CO2', 'harmonized_co2') is True
+    mock_session.sql().collect.return_value = [Row('harmonized_co2')]
+    assert harmonized_function.table_exists(mock_session, 'HARMONIZED_CO2', 'harmonized_co2') is True
 
-def test_table_exists_when_table_absent(mock_session):
+def test_table_exists_when_table_absent(mock_session, harmonized_function):
     """Test table_exists when table is not present."""
     mock_session.sql().collect.return_value = []
-    assert table_exists(mock_session, 'HARMONIZED_CO2', 'harmonized_co2') is False
+    assert harmonized_function.table_exists(mock_session, 'HARMONIZED_CO2', 'harmonized_co2') is False
 
-def test_table_exists_handle_exception(mock_session):
+def test_table_exists_handle_exception(mock_session, harmonized_function):
     """Test table_exists error handling."""
     mock_session.sql.side_effect = Exception("Query error")
-    assert table_exists(mock_session, 'HARMONIZED_CO2', 'harmonized_co2') is False
+    assert harmonized_function.table_exists(mock_session, 'HARMONIZED_CO2', 'harmonized_co2') is False
 
-def test_create_harmonized_table(mock_session):
+def test_create_harmonized_table(mock_session, harmonized_function):
     """Test create_harmonized_table function."""
-    create_harmonized_table(mock_session)
+    harmonized_function.create_harmonized_table(mock_session)
     
     # Instead of checking call count, check that SQL was called with the right statement
     mock_session.sql.assert_any_call("""
@@ -67,7 +66,7 @@ def test_create_harmonized_table(mock_session):
     # Check that collect() was called after sql()
     mock_session.sql().collect.assert_called()
 
-def test_merge_raw_into_harmonized_success():
+def test_merge_raw_into_harmonized_success(harmonized_function):
     """Test successful merge of raw data into harmonized table."""
     mock_session = MagicMock()
     
@@ -93,43 +92,41 @@ def test_merge_raw_into_harmonized_success():
     # Mock successful warehouse scaling
     mock_session.get_current_warehouse.return_value = "TEST_WAREHOUSE"
     
-    assert merge_raw_into_harmonized(mock_session) is True
+    assert harmonized_function.merge_raw_into_harmonized(mock_session) is True
 
-def test_merge_raw_into_harmonized_failure(mock_session):
+def test_merge_raw_into_harmonized_failure(mock_session, harmonized_function):
     """Test merge operation failure."""
     # Make the table method raise an exception
     mock_session.table.side_effect = Exception("Database error")
     
-    # Set the environment variable
-    with patch.object(harmonized_function, 'env', 'dev'):
-        assert merge_raw_into_harmonized(mock_session) is False
+    assert harmonized_function.merge_raw_into_harmonized(mock_session) is False
 
-def test_main_table_exists(mock_session):
+def test_main_table_exists(mock_session, harmonized_function):
     """Test main function when table exists."""
     # Mock table_exists to return True
     with patch.object(harmonized_function, "table_exists", return_value=True), \
          patch.object(harmonized_function, "merge_raw_into_harmonized", return_value=True):
-        result = main(mock_session)
+        result = harmonized_function.main(mock_session)
     
     assert "merge complete" in result
     
-def test_main_table_doesnt_exist(mock_session):
+def test_main_table_doesnt_exist(mock_session, harmonized_function):
     """Test main function when table doesn't exist."""
     # Mock table_exists to return False
     with patch.object(harmonized_function, "table_exists", return_value=False), \
          patch.object(harmonized_function, "create_harmonized_table") as mock_create, \
          patch.object(harmonized_function, "merge_raw_into_harmonized", return_value=True):
-        result = main(mock_session)
+        result = harmonized_function.main(mock_session)
     
     # Check that create_harmonized_table was called
     mock_create.assert_called_once_with(mock_session)
     assert "merge complete" in result
 
-def test_main_merge_failure(mock_session):
+def test_main_merge_failure(mock_session, harmonized_function):
     """Test main function when merge fails."""
     with patch.object(harmonized_function, "table_exists", return_value=True), \
          patch.object(harmonized_function, "merge_raw_into_harmonized", return_value=False):
-        result = main(mock_session)
+        result = harmonized_function.main(mock_session)
     
     assert "Error during merge" in result
 
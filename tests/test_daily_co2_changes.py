@@ -3,8 +3,8 @@ import sys
 import os
 
 # Add the parent directory to path so we can import the function module
-sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "udfs_and_spoc", "daily_co2_changes", "daily_changes"))
-from function import co2_percent_change
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from udfs_and_spoc.daily_co2_changes.daily_changes.function import co2_percent_change
 
 def test_normal_calculation():
     """Test normal percentage change calculation."""
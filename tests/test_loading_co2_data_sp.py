@@ -7,16 +7,16 @@ from datetime import datetime
 from unittest.mock import patch, MagicMock, Mock
 # Add the parent directory to path so we can import the function module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from udfs_and_spoc.loading_co2_data_sp.loading_data_sp.function import fetch_co2_data_incremental
+import re
+from udfs_and_spoc.loading_co2_data_sp.loading_data_sp.function import fetch_co2_data_incremental, _staged_years_pattern, _read_noaa_frame
 
 @pytest.fixture
-def mock_session():
-    """Create a mock Snowflake session."""
-    mock = MagicMock()
+def mock_session(mock_session):
+    """The shared mock Snowflake session, with queries returning one result row by default."""
     # Mock collect method to return data
     mock_result = MagicMock()
-    mock.sql().collect.return_value = [mock_result]
-    return mock
+    mock_session.sql().collect.return_value = [mock_result]
+    return mock_session
 
 @pytest.fixture
 def mock_requests_get():
@@ -58,9 +58,9 @@ def mock_env_vars(monkeypatch):
 def test_fetch_co2_data_incremental(mock_session, mock_requests_get, mock_boto3_client, 
                                    mock_env_vars, latest_date, expected_outcome):
     """Test fetching CO2 data with different latest dates."""
-    # Configure the mock_session to return the latest date
+    # Configure the mock_session to return the latest date as a YYYYMMDD key
     mock_result = mock_session.sql().collect.return_value[0]
-    mock_result.__getitem__.return_value = pd.to_datetime(latest_date) if latest_date else None
+    mock_result.__getitem__.return_value = int(latest_date.replace("-", "")) if latest_date else None
     
     # Apply patches
     with patch("requests.get", mock_requests_get), \
@@ -106,5 +106,26 @@ def test_error_handling_db_query_failure(mock_session, mock_env_vars):
     assert "ERROR" in result
     assert "Failed to get latest date" in result
 
+def test_staged_years_pattern_matches_unloaded_file_names():
+    """The combined COPY pattern matches the files COPY INTO @stage writes, and only for staged years."""
+    pattern = _staged_years_pattern([2023, 2024])
+    # Unloading without SINGLE = TRUE appends a part suffix and the compression extension
+    assert re.fullmatch(pattern, "noaa-co2-data/2024/co2_daily_mlo.csv_0_0_0.csv.gz")
+    assert re.fullmatch(pattern, "noaa-co2-data/2023/co2_daily_mlo.csv")
+    assert not re.fullmatch(pattern, "noaa-co2-data/2022/co2_daily_mlo.csv_0_0_0.csv.gz")
+
+def test_read_noaa_frame_skips_truncated_lines():
+    """Lines with fewer than five fields are dropped instead of loaded with a NULL CO2_ppm."""
+    current_year = datetime.now().year
+    source = io.StringIO(f"""# CO2 data from Mauna Loa Observatory
+{current_year} 1 1 {current_year}.000 418.50
+{current_year} 1 2 {current_year}.003
+{current_year} 1 3 {current_year}.005 418.75
+""")
+    data_line_count, df = _read_noaa_frame(source, current_year)
+    assert data_line_count == 3
+    assert df["Day"].tolist() == [1, 3]
+    assert not df["CO2_ppm"].isna().any()
+
 if __name__ == "__main__":
-    pytest.main()
\ No newline at end of file
+    pytest.main()
@@ -0,0 +1,48 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from scripts.deployment_files import snowflake_deployer
+
+PROJECT_CONFIG = """definition_version: 1
+snowpark:
+  project_name: "{name}_project"
+  stage_name: "ANALYTICS_CO2.deployment"
+  src: "{name}/"
+  functions:
+    - name: "{name}"
+      handler: "function.main"
+      signature:
+        - name: "input_data"
+          type: "FLOAT"
+      returns: "FLOAT"
+"""
+
+@pytest.fixture
+def components(tmp_path):
+    """Three UDF components laid out like udfs_and_spoc/, as (path, name, type) tuples."""
+    result = []
+    for name in ("udf_one", "udf_two", "udf_three"):
+        component_dir = tmp_path / name
+        (component_dir / name).mkdir(parents=True)
+        (component_dir / name / "function.py").write_text("def main(input_data):\n    return input_data\n")
+        (component_dir / "snowflake.yml").write_text(PROJECT_CONFIG.format(name=name))
+        result.append((str(component_dir), name, "udf"))
+    return result
+
+def test_deploy_components_dry_run_uses_one_pool(components):
+    """Component workers deploy their projects inline instead of starting nested pools and deployers."""
+    conn_config = {"account": "acct", "user": "user", "database": "CO2_DB_DEV", "schema": "ANALYTICS_CO2"}
+    with patch.dict(os.environ), \
+            patch.object(snowflake_deployer, "get_connection_config", return_value=conn_config), \
+            patch.object(snowflake_deployer.snowflake.connector, "connect") as mock_connect, \
+            snowflake_deployer.SnowflakeDeployer("dev", dry_run=True) as deployer, \
+            patch.object(snowflake_deployer, "SnowflakeDeployer", wraps=snowflake_deployer.SnowflakeDeployer) as nested_deployers, \
+            patch.object(snowflake_deployer, "ThreadPoolExecutor", wraps=ThreadPoolExecutor) as pools:
+        assert deployer.deploy_components(components)
+
+    assert pools.call_count == 1
+    nested_deployers.assert_not_called()
+    mock_connect.assert_not_called()
@@ -2,9 +2,9 @@ import pytest
 import sys
 import os
 
-# Add the path to the function module
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'udfs_and_spoc', 'python_udf', 'co2_volatility'))
-from function import calculate_co2_volatility
+# Add the parent directory to path so we can import the function module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from udfs_and_spoc.python_udf.co2_volatility.function import calculate_co2_volatility
 
 # Test normal cases
 @pytest.mark.parametrize("current, previous, expected", [
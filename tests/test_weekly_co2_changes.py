@@ -3,11 +3,10 @@ import sys
 import unittest
 
 # Add the parent directory to path so we can import the function module
-sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
-                           "udfs_and_spoc", "weekly_co2_changes", "weekly_changes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Import the function directly
-from function import co2_weekly_percent_change
+# Import by package path, so this doesn't clash with other components' function modules
+from udfs_and_spoc.weekly_co2_changes.weekly_changes.function import co2_weekly_percent_change
 
 class TestWeeklyCO2PercentChange(unittest.TestCase):
     
@@ -84,12 +84,7 @@ def create_weekly_stats_table(session):
 
 def process_daily_metrics(session):
     """Process daily metrics using Snowpark DataFrame API instead of raw SQL."""
-    current_warehouse = session.get_current_warehouse()
     try:
-        # Scale warehouse up for better performance
-        if current_warehouse:
-            session.sql(f"ALTER WAREHOUSE {current_warehouse} SET WAREHOUSE_SIZE = LARGE WAIT_FOR_COMPLETION = TRUE").collect()
-        
         print("Processing daily CO2 metrics...")
         
         # First, try to access the temporary _CO2_MINMAX table created by harmonized procedure
@@ -145,18 +140,10 @@ def process_daily_metrics(session):
     except Exception as e:
         print(f"Error processing daily metrics: {str(e)}")
         raise
-    finally:
-        # Scale warehouse back down
-        if current_warehouse:
-            session.sql(f"ALTER WAREHOUSE {current_warehouse} SET WAREHOUSE_SIZE = XSMALL").collect()
 
 def process_weekly_metrics(session):
     """Process weekly metrics using Snowpark DataFrame API."""
-    current_warehouse = session.get_current_warehouse()
     try:
-        if current_warehouse:
-            session.sql(f"ALTER WAREHOUSE {current_warehouse} SET WAREHOUSE_SIZE = LARGE WAIT_FOR_COMPLETION = TRUE").collect()
-        
         print("Processing weekly CO2 metrics...")
         
         # First, try to access the min/max values (reuse the same code as in daily metrics)
@@ -219,15 +206,13 @@ def process_weekly_metrics(session):
     except Exception as e:
         print(f"Error processing weekly metrics: {str(e)}")
         raise
-    finally:
-        # Scale warehouse back down
-        if current_warehouse:
-            session.sql(f"ALTER WAREHOUSE {current_warehouse} SET WAREHOUSE_SIZE = XSMALL").collect()
 
 def create_analytics_tables(session: Session) -> str:
     """
     Creates analytics tables with essential metrics using Python and SQL UDFs.
     """
+    current_warehouse = None
+    scaled_up = False
     try:
         # First check if tables already exist
         daily_exists = table_exists(session, schema='ANALYTICS_CO2', name='DAILY_CO2_STATS')
@@ -239,6 +224,13 @@ def create_analytics_tables(session: Session) -> str:
         if not weekly_exists:
             create_weekly_stats_table(session)
         
+        # Scale warehouse up once for both metric passes, instead of resizing
+        # up and back down around each of them
+        current_warehouse = session.get_current_warehouse()
+        if current_warehouse:
+            scaled_up = True
+            session.sql(f"ALTER WAREHOUSE {current_warehouse} SET WAREHOUSE_SIZE = LARGE WAIT_FOR_COMPLETION = TRUE").collect()
+        
         # Process and merge the data
         process_daily_metrics(session)
         process_weekly_metrics(session)
@@ -249,6 +241,13 @@ def create_analytics_tables(session: Session) -> str:
         import traceback
         traceback.print_exc()
         return f"Error: {str(e)}"
+    finally:
+        # Scale warehouse back down, even if there was an error
+        if scaled_up:
+            try:
+                session.sql(f"ALTER WAREHOUSE {current_warehouse} SET WAREHOUSE_SIZE = XSMALL").collect()
+            except Exception as scaling_error:
+                print(f"Warning: Failed to scale down warehouse: {scaling_error}")
     
 def main(session: Session) -> str:
     """Main function to be called by the stored procedure."""
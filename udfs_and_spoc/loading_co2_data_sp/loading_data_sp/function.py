@@ -4,6 +4,167 @@ import requests
 import pandas as pd
 from snowflake.snowpark import Session
 import re
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+# Columns of the NOAA daily CO2 feed and the types they are parsed into
+NOAA_COLUMNS = ["Year", "Month", "Day", "Decimal_Date", "CO2_ppm"]
+NOAA_DTYPES = {"Year": "int64", "Month": "int64", "Day": "int64", "Decimal_Date": "float64", "CO2_ppm": "float64"}
+# Matching RAW_CO2.CO2_DATA columns
+RAW_TABLE_COLUMNS = ["YEAR", "MONTH", "DAY", "DECIMAL_DATE", "CO2_PPM"]
+# Incremental batches smaller than this are loaded with write_pandas instead of via S3
+WRITE_PANDAS_MAX_ROWS = 100_000
+# Resizing with WAIT_FOR_COMPLETION takes longer than loading anything smaller than this
+SCALE_UP_MIN_ROWS = 100_000
+# Upper bound on years staged to S3 at once; each one is a PUT plus a COPY round trip
+MAX_STAGE_WORKERS = 8
+# Fallback pattern for NOAA data lines (year, month, day, decimal date, ppm) inside a JSON body
+NOAA_LINE_RE = re.compile(r"\s*(\d{4})\s+(\d{1,2})\s+(\d{1,2})\s+(\d{4}\.\d+)\s+(\d+\.\d+)")
+
+def _staged_years_pattern(years):
+    """
+    COPY PATTERN for the files _stage_year wrote for the given years.
+    
+    Unloading to <year>/co2_daily_mlo.csv makes Snowflake write
+    co2_daily_mlo.csv_0_0_0.csv.gz, so the pattern allows any suffix.
+    """
+    year_pattern = "|".join(str(year) for year in years)
+    return rf".*({year_pattern})/co2_daily_mlo\.csv.*"
+
+def _read_noaa_frame(source, current_year):
+    """
+    Parse NOAA daily CO2 data with pandas' C parser, keeping rows for the
+    current year onward.
+    
+    source can be any text or binary file-like object (e.g. a streamed
+    response), so the full text never needs to be held in memory.
+    
+    Returns (number of data lines seen, filtered DataFrame).
+    """
+    df = pd.read_csv(
+        source,
+        comment="#",
+        sep=r"\s+",
+        header=None,
+        usecols=range(5),
+        names=NOAA_COLUMNS,
+        dtype=NOAA_DTYPES,
+        on_bad_lines="skip",
+    )
+    # on_bad_lines only drops lines with too many fields; a truncated line
+    # comes through with CO2_ppm missing, so drop those rows as well
+    complete = df.dropna(subset=["CO2_ppm"])
+    return len(df), complete[complete["Year"] >= current_year].copy()
+
+def _stage_year(session, parent_folder, year, upload_df):
+    """
+    Put one year's rows on the user stage as CSV, then copy them to the
+    external S3 stage under <parent_folder>/<year>/co2_daily_mlo.csv.
+    
+    Raises on failure so the caller can fall back to direct inserts.
+    """
+    # Convert to CSV
+    csv_data = upload_df.to_csv(index=False)
+    
+    # File name for internal staging
+    temp_file_name = f"co2_data_{year}.csv"
+    
+    # Stage path for external S3
+    external_stage_path = f"{parent_folder}/{year}/co2_daily_mlo.csv"
+    
+    # Upload data to user stage first
+    session.file.put(csv_data, f"@RAW_CO2.USER_TEMP_STAGE/{temp_file_name}", overwrite=True)
+    print(f"Uploaded data to user stage: @RAW_CO2.USER_TEMP_STAGE/{temp_file_name}")
+    
+    # Copy from user stage to external S3 stage
+    copy_cmd = f"""
+    COPY INTO @EXTERNAL.NOAA_CO2_STAGE/{external_stage_path}
+    FROM @RAW_CO2.USER_TEMP_STAGE/{temp_file_name}
+    FILE_FORMAT = (TYPE = CSV)
+    OVERWRITE = TRUE
+    """
+    session.sql(copy_cmd).collect()
+    print(f"Copied to external S3 stage: {external_stage_path}")
+
+def _insert_rows_directly(session, upload_df, year):
+    """
+    Fallback loader for one year of rows: batched INSERT ... VALUES statements,
+    then row-by-row inserts if that fails.
+    
+    Returns the label recorded in years_loaded; raises if neither method works.
+    """
+    # Get column names from the upload DataFrame
+    print(f"DataFrame columns: {upload_df.columns}")
+
+    try:
+        # Convert to Snowpark DataFrame with explicit column mapping
+        # This ensures column names match exactly what Snowflake expects
+        snowpark_df = session.create_dataframe(upload_df)
+
+        # Rename columns to match Snowflake's uppercase convention
+        snowpark_df = snowpark_df.to_df("YEAR", "MONTH", "DAY", "DECIMAL_DATE", "CO2_PPM")
+
+        # Show the Snowpark DataFrame structure
+        print("Snowpark DataFrame schema:")
+        snowpark_df.printSchema()
+
+        # Insert directly using SQL with VALUES
+        records = upload_df.to_records(index=False)
+        batch_size = 100  # Process in batches to avoid huge SQL statements
+
+        for i in range(0, len(records), batch_size):
+            batch = records[i:i+batch_size]
+            values_str = []
+
+            for row in batch:
+                # Format each value properly for SQL
+                year = int(row[0])
+                month = int(row[1])
+                day = int(row[2])
+                decimal_date = float(row[3])
+                co2_ppm = float(row[4])
+
+                values_str.append(f"({year}, {month}, {day}, {decimal_date}, {co2_ppm})")
+
+            # Join all value strings
+            all_values = ", ".join(values_str)
+
+            # Execute the insert
+            insert_sql = f"""
+            INSERT INTO RAW_CO2.CO2_DATA (YEAR, MONTH, DAY, DECIMAL_DATE, CO2_PPM)
+            VALUES {all_values}
+            """
+            session.sql(insert_sql).collect()
+            print(f"Inserted batch of {len(batch)} rows directly")
+
+        return f"{year}(direct)"
+    
+    except Exception as insert_error:
+        print(f"Direct insert error: {insert_error}")
+        # Try even simpler approach - one row at a time
+        print("Falling back to row-by-row insertion...")
+        inserted = 0
+
+        for _, row in upload_df.iterrows():
+            try:
+                # Format each value and handle potential type issues
+                year = int(row['Year'])
+                month = int(row['Month'])
+                day = int(row['Day'])
+                decimal_date = float(row['Decimal_Date'])
+                co2_ppm = float(row['CO2_ppm'])
+
+                insert_sql = f"""
+                INSERT INTO RAW_CO2.CO2_DATA (YEAR, MONTH, DAY, DECIMAL_DATE, CO2_PPM)
+                VALUES ({year}, {month}, {day}, {decimal_date}, {co2_ppm})
+                """
+                session.sql(insert_sql).collect()
+                inserted += 1
+            except Exception as row_error:
+                print(f"Error inserting row: {row_error}")
+
+        print(f"Inserted {inserted} rows individually")
+        return f"{year}(row-insert:{inserted})"
 
 def fetch_co2_data_incremental(session, env):
     """
@@ -38,17 +199,18 @@ def fetch_co2_data_incremental(session, env):
     print("Finding latest date in RAW_CO2.CO2_DATA...")
     
     try:
+        # An integer YYYYMMDD key aggregates without building a date per row and
+        # compares directly with the date_key computed for the NOAA rows below
         latest_date_result = session.sql("""
-            SELECT 
-                MAX(TO_DATE(CONCAT(
-                    LPAD(YEAR::STRING, 4, '0'), '-',
-                    LPAD(MONTH::STRING, 2, '0'), '-',
-                    LPAD(DAY::STRING, 2, '0')))
-                ) AS MAX_DATE 
-            FROM RAW_CO2.CO2_DATA
+            SELECT MAX(YEAR * 10000 + MONTH * 100 + DAY) AS MAX_KEY FROM RAW_CO2.CO2_DATA
         """).collect()
         
-        latest_date = latest_date_result[0]["MAX_DATE"] if latest_date_result[0]["MAX_DATE"] else None
+        latest_key = latest_date_result[0]["MAX_KEY"]
+        latest_date = None
+        if latest_key:
+            latest_key = int(latest_key)
+            year, month_day = divmod(latest_key, 10000)
+            latest_date = datetime.date(year, *divmod(month_day, 100))
         print(f"Latest date in RAW_CO2.CO2_DATA: {latest_date}")
         
     except Exception as e:
@@ -61,22 +223,20 @@ def fetch_co2_data_incremental(session, env):
 
     try:
         # Get the current year
-        import datetime
         current_year = datetime.datetime.now().year
         print(f"Focusing on data for current year: {current_year}")
         
-        response = requests.get(url)
-        if response.status_code != 200:
-            return f"ERROR: Failed to fetch data from NOAA. Status code: {response.status_code}"
-        
-        print(f"Response type: {type(response.text)}")
-        print(f"Response content preview: {response.text[:100]}")
-        
-        # Robust response parsing
-        noaa_text = ""
+        # Stream the response so plain-text payloads are parsed as they arrive
+        # instead of materializing the whole NOAA history in memory
+        response = requests.get(url, stream=True)
         try:
-            # Handle different response formats
-            if "application/json" in response.headers.get('Content-Type', ''):
+            if response.status_code != 200:
+                return f"ERROR: Failed to fetch data from NOAA. Status code: {response.status_code}"
+            
+            noaa_text = None
+            content_type = response.headers.get('Content-Type', '')
+            if "application/json" in content_type:
+                # The JSON wrapper has to be read in full before the body can be used
                 print("Content-Type is JSON, parsing as JSON")
                 try:
                     response_json = response.json()
@@ -91,102 +251,59 @@ def fetch_co2_data_incremental(session, env):
                 except Exception as json_error:
                     print(f"JSON parsing failed: {str(json_error)}, using raw text")
                     noaa_text = str(response.text)
+                print(f"Text preview: {noaa_text[:50]}...")
             else:
-                # If content type is not JSON, use the raw text
-                print(f"Content-Type is not JSON: {response.headers.get('Content-Type', 'unknown')}")
-                noaa_text = str(response.text)
-                print("Using raw response text")
-                
-            print(f"Final noaa_text type: {type(noaa_text)}")
-            print(f"Text preview: {noaa_text[:50]}...")
-        except Exception as e:
-            print(f"Fallback: Error parsing response: {str(e)}")
-            # Ultimate fallback - use the raw text as a string
-            noaa_text = str(response.text)
-            print(f"Using raw text as fallback, length: {len(noaa_text)}")
-        
-        # Parse NOAA data, skipping comment lines
-        lines = []
-        try:
-            if isinstance(noaa_text, str):
-                lines = [line for line in noaa_text.split("\n") 
-                        if line and not line.startswith("#") and line.strip()]
-                print(f"Standard parsing found {len(lines)} data lines")
-            else:
-                print(f"Warning: noaa_text is not a string but {type(noaa_text)}")
-                noaa_text = str(noaa_text)
-                lines = [line for line in noaa_text.split("\n") 
-                        if line and not line.startswith("#") and line.strip()]
-        except Exception as parsing_error:
-            print(f"Error in standard parsing: {parsing_error}")
+                print(f"Content-Type is not JSON: {content_type or 'unknown'}, streaming response into the CSV parser")
+                # Let urllib3 undo any gzip/deflate transfer encoding as pandas reads
+                response.raw.decode_content = True
+            
+            # Parse NOAA data, skipping comment lines and keeping only current year rows
+            try:
+                source = io.StringIO(noaa_text) if noaa_text is not None else response.raw
+                data_line_count, df = _read_noaa_frame(source, current_year)
+                print(f"Standard parsing found {data_line_count} data lines")
+            except Exception as parsing_error:
+                print(f"Error in standard parsing: {parsing_error}")
+                if noaa_text is None:
+                    return f"ERROR: Failed to parse CO2 data: {str(parsing_error)}"
+                data_line_count, df = 0, None
+        finally:
+            response.close()
         
-        # FALLBACK: If standard parsing failed or returned too few lines, try regex
-        if not lines or len(lines) < 10:
+        # FALLBACK: If standard parsing returned too few lines, try regex on the JSON body.
+        # A streamed text response has no escaped body for regex to recover anything extra from.
+        if data_line_count < 10 and noaa_text is not None:
             print("Fallback to regex extraction of CO2 data")
             try:
                 # Extract data lines with regex - matching lines with year, month, day pattern
-                pattern = r"\s*(\d{4})\s+(\d{1,2})\s+(\d{1,2})\s+(\d{4}\.\d+)\s+(\d+\.\d+)"
-                matches = re.findall(pattern, noaa_text)
+                matches = NOAA_LINE_RE.findall(noaa_text)
                 
                 if matches:
                     print(f"Found {len(matches)} data lines using regex")
                     # Continue with the matched data
-                    parsed_data = []
-                    for match in matches:
-                        year, month, day, decimal_date, co2_ppm = match
-                        # Only keep data for current year and newer
-                        if int(year) >= current_year:
-                            parsed_data.append([year, month, day, decimal_date, co2_ppm])
-                    print(f"After year filtering, have {len(parsed_data)} data points")
+                    df = pd.DataFrame(matches, columns=NOAA_COLUMNS).astype(NOAA_DTYPES)
+                    # Only keep data for current year and newer
+                    df = df[df["Year"] >= current_year].copy()
+                    print(f"After year filtering, have {len(df)} data points")
                 else:
                     return "ERROR: Failed to extract CO2 data from response using regex"
             except Exception as regex_error:
                 print(f"Error in regex parsing: {regex_error}")
                 return f"ERROR: All parsing methods failed: {str(regex_error)}"
         else:
-            # Parse into columns, only keeping current year data
-            parsed_data = []
-            for line in lines:
-                try:
-                    parts = line.split()
-                    # Only take the columns we need and only for current year
-                    if len(parts) >= 5 and int(parts[0]) >= current_year:
-                        parsed_data.append(parts[:5])
-                except Exception as line_error:
-                    print(f"Error parsing line: {line_error} on line: {line[:50]}")
-                    # Skip this line and continue
-                    continue
-            
-            print(f"After parsing, found {len(parsed_data)} data points for current year+")
+            print(f"After parsing, found {len(df)} data points for current year+")
         
-        # Create DataFrame (now with only current year data)
-        columns = ["Year", "Month", "Day", "Decimal_Date", "CO2_ppm"]
-        if not parsed_data:
+        # DataFrame now holds only current year data, already typed by the parser
+        if df.empty:
             return "ERROR: No valid CO2 data found for the current year"
-            
-        df = pd.DataFrame(parsed_data, columns=columns)
         
-        # Convert columns to appropriate types with error handling
-        try:
-            df["Year"] = df["Year"].astype(int)
-            df["Month"] = df["Month"].astype(int)
-            df["Day"] = df["Day"].astype(int)
-            df["Decimal_Date"] = df["Decimal_Date"].astype(float)
-            df["CO2_ppm"] = pd.to_numeric(df["CO2_ppm"], errors="coerce")
-            
-            # Create a date column for filtering
-            df["Date"] = pd.to_datetime(df[["Year", "Month", "Day"]])
+        print(f"Fetched {len(df)} records from NOAA for {current_year}")
             
-            print(f"Fetched {len(df)} records from NOAA for {current_year}")
-        except Exception as conversion_error:
-            print(f"Error converting data types: {str(conversion_error)}")
-            print("DataFrame preview:")
-            print(df.head())
-            return f"ERROR: Failed to convert data types: {str(conversion_error)}"
-            
-        # Step 3: Filter for new records only
+        # Step 3: Filter for new records only, comparing integer YYYYMMDD keys
+        # instead of building a datetime column
         if latest_date:
-            df_new = df[df["Date"] > pd.to_datetime(latest_date)]
+            date_key = df["Year"].values * 10000 + df["Month"].values * 100 + df["Day"].values
+            df_new = df[date_key > latest_key]
             print(f"Found {len(df_new)} new records since {latest_date}")
         else:
             df_new = df
@@ -197,153 +314,108 @@ def fetch_co2_data_incremental(session, env):
             return "No new CO2 data to load. Database is up to date."
 
         # Scale up the warehouse for better performance if environment is provided
-        if env:
+        # and the batch is large enough to be worth waiting for the resize
+        scaled_up = False
+        if not env:
+            print("No environment specified, skipping warehouse scaling")
+        elif len(df_new) < SCALE_UP_MIN_ROWS:
+            print(f"Only {len(df_new)} new records, keeping current warehouse size")
+        else:
+            # Scale back down afterwards even if this errors part way through
+            scaled_up = True
             try:
                 session.sql(f"ALTER WAREHOUSE co2_wh_{env} SET WAREHOUSE_SIZE = LARGE WAIT_FOR_COMPLETION = TRUE").collect()
                 print(f"Scaled up warehouse co2_wh_{env} to LARGE")
             except Exception as e:
                 print(f"Warning: Could not scale up warehouse: {e}")
-        else:
-            print("No environment specified, skipping warehouse scaling")
         
         try:
-            # Step 4: Upload data to S3 using Snowflake storage integration
-            print(f"Uploading {len(df_new)} new records to S3 using Snowflake stage...")
+            years_loaded = []
+            loaded_directly = False
             
-            # Create a user staging area if it doesn't exist
-            try:
-                session.sql("CREATE STAGE IF NOT EXISTS RAW_CO2.USER_TEMP_STAGE").collect()
-                print("Created or confirmed user temporary stage")
-            except Exception as e:
-                print(f"Warning: Could not create temp stage: {e}")
+            # Step 4a: Small incremental batches go straight into the table. write_pandas
+            # PUTs to an internal stage and COPYs in one call, skipping the S3 hop.
+            if len(df_new) < WRITE_PANDAS_MAX_ROWS:
+                try:
+                    load_df = df_new[NOAA_COLUMNS].rename(columns=dict(zip(NOAA_COLUMNS, RAW_TABLE_COLUMNS)))
+                    session.write_pandas(
+                        load_df,
+                        "CO2_DATA",
+                        schema="RAW_CO2",
+                        quote_identifiers=False,
+                        auto_create_table=False,
+                        parallel=4,
+                        chunk_size=16000
+                    )
+                    years_loaded = [str(year) for year in sorted(df_new["Year"].unique())]
+                    loaded_directly = True
+                    print(f"Loaded {len(load_df)} new records with write_pandas")
+                except Exception as write_error:
+                    print(f"write_pandas failed: {write_error}, falling back to S3 staging")
             
-            # Upload by year partitions
-            years_loaded = []
-            for year, year_df in df_new.groupby("Year"):
-                # Drop the Date column as it's not in the original data
-                upload_df = year_df.drop(columns=["Date"])
-                
-                # Convert to CSV
-                csv_data = upload_df.to_csv(index=False)
-                
-                # File name for internal staging
-                temp_file_name = f"co2_data_{year}.csv"
-                
-                # Stage path for external S3
-                external_stage_path = f"{PARENT_FOLDER}/{year}/co2_daily_mlo.csv"
-                
+            # Step 4b: Bulk reloads (or a failed direct load) go through S3 using Snowflake storage integration
+            if not loaded_directly:
+                print(f"Uploading {len(df_new)} new records to S3 using Snowflake stage...")
+            
+                # Create a user staging area if it doesn't exist
                 try:
-                    # Upload data to user stage first
-                    session.file.put(csv_data, f"@RAW_CO2.USER_TEMP_STAGE/{temp_file_name}", overwrite=True)
-                    print(f"Uploaded data to user stage: @RAW_CO2.USER_TEMP_STAGE/{temp_file_name}")
-                    
-                    # Copy from user stage to external S3 stage
-                    copy_cmd = f"""
-                    COPY INTO @EXTERNAL.NOAA_CO2_STAGE/{external_stage_path}
-                    FROM @RAW_CO2.USER_TEMP_STAGE/{temp_file_name}
-                    FILE_FORMAT = (TYPE = CSV)
-                    OVERWRITE = TRUE
-                    """
-                    session.sql(copy_cmd).collect()
-                    print(f"Copied to external S3 stage: {external_stage_path}")
-                    
-                    # Now COPY from S3 stage to RAW_CO2.CO2_DATA table
+                    session.sql("CREATE STAGE IF NOT EXISTS RAW_CO2.USER_TEMP_STAGE").collect()
+                    print("Created or confirmed user temporary stage")
+                except Exception as e:
+                    print(f"Warning: Could not create temp stage: {e}")
+            
+                # Upload by year partitions. Each year is a PUT plus a COPY to S3 that mostly
+                # waits on Snowflake, so stage the years concurrently on the shared session.
+                # Years staged in S3 and waiting for the single COPY into the table
+                staged_years = {}
+                year_groups = list(df_new.groupby("Year"))
+                with ThreadPoolExecutor(max_workers=min(MAX_STAGE_WORKERS, len(year_groups))) as executor:
+                    futures = [
+                        (year, year_df, executor.submit(_stage_year, session, PARENT_FOLDER, year, year_df))
+                        for year, year_df in year_groups
+                    ]
+                
+                for year, upload_df, future in futures:
+                    stage_error = future.exception()
+                    if stage_error is None:
+                        staged_years[year] = upload_df
+                        continue
+                    print(f"Error in staging process for {year}: {stage_error}")
+                    print("Falling back to direct DataFrame insertion...")
+                    try:
+                        years_loaded.append(_insert_rows_directly(session, upload_df, year))
+                    except Exception as row_insert_error:
+                        print(f"Row insertion error: {row_insert_error}")
+                        return f"ERROR: Failed to load data using any method: {str(row_insert_error)}"
+            
+                # Now COPY every staged year from S3 into RAW_CO2.CO2_DATA in one statement
+                if staged_years:
                     copy_to_table_cmd = f"""
                     COPY INTO RAW_CO2.CO2_DATA (YEAR, MONTH, DAY, DECIMAL_DATE, CO2_PPM)
-                    FROM @EXTERNAL.NOAA_CO2_STAGE/{external_stage_path}
+                    FROM @EXTERNAL.NOAA_CO2_STAGE/{PARENT_FOLDER}/
                     FILE_FORMAT = (
                         TYPE = CSV
                         FIELD_DELIMITER = ','
                         SKIP_HEADER = 1
                         FIELD_OPTIONALLY_ENCLOSED_BY = '"'
                     )
+                    PATTERN = '{_staged_years_pattern(staged_years)}'
                     ON_ERROR = CONTINUE
                     """
-                    copy_result = session.sql(copy_to_table_cmd).collect()
-                    print(f"Loaded data from S3 to Snowflake: {copy_result}")
-                    years_loaded.append(str(year))
-                    
-                except Exception as stage_error:
-                    print(f"Error in staging process: {stage_error}")
-                    print("Falling back to direct DataFrame insertion...")
-                    
-                    # Get column names from the upload DataFrame
-                    print(f"DataFrame columns: {upload_df.columns}")
-                    
                     try:
-                        # Convert to Snowpark DataFrame with explicit column mapping
-                        # This ensures column names match exactly what Snowflake expects
-                        snowpark_df = session.create_dataframe(upload_df)
-                        
-                        # Rename columns to match Snowflake's uppercase convention
-                        snowpark_df = snowpark_df.to_df("YEAR", "MONTH", "DAY", "DECIMAL_DATE", "CO2_PPM")
-                        
-                        # Show the Snowpark DataFrame structure
-                        print("Snowpark DataFrame schema:")
-                        snowpark_df.printSchema()
-                        
-                        # Insert directly using SQL with VALUES
-                        records = upload_df.to_records(index=False)
-                        batch_size = 100  # Process in batches to avoid huge SQL statements
-                        
-                        for i in range(0, len(records), batch_size):
-                            batch = records[i:i+batch_size]
-                            values_str = []
-                            
-                            for row in batch:
-                                # Format each value properly for SQL
-                                year = int(row[0])
-                                month = int(row[1])
-                                day = int(row[2])
-                                decimal_date = float(row[3])
-                                co2_ppm = float(row[4])
-                                
-                                values_str.append(f"({year}, {month}, {day}, {decimal_date}, {co2_ppm})")
-                            
-                            # Join all value strings
-                            all_values = ", ".join(values_str)
-                            
-                            # Execute the insert
-                            insert_sql = f"""
-                            INSERT INTO RAW_CO2.CO2_DATA (YEAR, MONTH, DAY, DECIMAL_DATE, CO2_PPM)
-                            VALUES {all_values}
-                            """
-                            session.sql(insert_sql).collect()
-                            print(f"Inserted batch of {len(batch)} rows directly")
-                        
-                        years_loaded.append(f"{year}(direct)")
-                        
-                    except Exception as insert_error:
-                        print(f"Direct insert error: {insert_error}")
-                        # Try even simpler approach - one row at a time
-                        try:
-                            print("Falling back to row-by-row insertion...")
-                            inserted = 0
-                            
-                            for _, row in upload_df.iterrows():
-                                try:
-                                    # Format each value and handle potential type issues
-                                    year = int(row['Year'])
-                                    month = int(row['Month'])
-                                    day = int(row['Day'])
-                                    decimal_date = float(row['Decimal_Date'])
-                                    co2_ppm = float(row['CO2_ppm'])
-                                    
-                                    insert_sql = f"""
-                                    INSERT INTO RAW_CO2.CO2_DATA (YEAR, MONTH, DAY, DECIMAL_DATE, CO2_PPM)
-                                    VALUES ({year}, {month}, {day}, {decimal_date}, {co2_ppm})
-                                    """
-                                    session.sql(insert_sql).collect()
-                                    inserted += 1
-                                except Exception as row_error:
-                                    print(f"Error inserting row: {row_error}")
-                            
-                            print(f"Inserted {inserted} rows individually")
-                            years_loaded.append(f"{year}(row-insert:{inserted})")
-                            
-                        except Exception as row_insert_error:
-                            print(f"Row insertion error: {row_insert_error}")
-                            return f"ERROR: Failed to load data using any method: {str(row_insert_error)}"            
+                        copy_result = session.sql(copy_to_table_cmd).collect()
+                        print(f"Loaded data from S3 to Snowflake: {copy_result}")
+                        years_loaded.extend(str(year) for year in staged_years)
+                    except Exception as copy_error:
+                        print(f"Error in staging process: {copy_error}")
+                        print("Falling back to direct DataFrame insertion...")
+                        for year, upload_df in staged_years.items():
+                            try:
+                                years_loaded.append(_insert_rows_directly(session, upload_df, year))
+                            except Exception as row_insert_error:
+                                print(f"Row insertion error: {row_insert_error}")
+                                return f"ERROR: Failed to load data using any method: {str(row_insert_error)}"
+            
             # Step 5: Verify the data was loaded and advance the stream
             count_sql = """
                 SELECT COUNT(*) as NEW_ROWS FROM RAW_CO2.CO2_DATA_STREAM 
@@ -372,7 +444,7 @@ def fetch_co2_data_incremental(session, env):
         
         finally:
             # Always scale down the warehouse when done, even if there was an error
-            if env:
+            if scaled_up:
                 try:
                     session.sql(f"ALTER WAREHOUSE co2_wh_{env} SET WAREHOUSE_SIZE = XSMALL").collect()
                     print("Warehouse scaled back down to XSMALL")